@@ -1,15 +1,22 @@
 """FastAPI endpoints for data processing."""
 
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
-from typing import List, Optional
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from typing import Any, Callable, List, Optional
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+import orjson
+import polars as pl
+import pandas as pd
+import pyarrow as pa
 
 from app.models.schemas import (
     HealthResponse, DiscoverRequest, DiscoverResponse,
+    DiscoverBatchRequest, DiscoverBatchItem, DiscoverBatchResponse, BootstrapResponse,
     InferSchemaRequest, InferSchemaResponse, PreviewRequest, PreviewResponse,
     QueryRequest, QueryResponse, AnalyzeRequest, AnalyzeResponse,
-    JobStatusResponse, JobStatus
+    JobStatusResponse
 )
 from app.services.job_manager import job_manager
 from app.services.data_processor import data_processor
@@ -17,29 +24,33 @@ from app.core.config import settings
 
 router = APIRouter()
 
+# Blocking Polars work runs here so it never stalls the event loop; Polars
+# releases the GIL inside its kernels, so threads give real parallelism
+executor = ThreadPoolExecutor(max_workers=settings.max_workers, thread_name_prefix="air-py")
+
+
+# Versions can't change while the process runs, so the health body is built once
+_HEALTH = HealthResponse(
+    status="ok",
+    versions={
+        "polars": pl.__version__,
+        "pandas": pd.__version__,
+        "pyarrow": pa.__version__
+    }
+)
+
 
 @router.get("/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint."""
-    import polars as pl
-    import pandas as pd
-    import pyarrow as pa
-    
-    return HealthResponse(
-        status="ok",
-        versions={
-            "polars": pl.__version__,
-            "pandas": pd.__version__,
-            "pyarrow": pa.__version__
-        }
-    )
+    return _HEALTH
 
 
 @router.post("/discover", response_model=DiscoverResponse)
 async def discover_files(request: DiscoverRequest, background_tasks: BackgroundTasks):
     """Discover files in a directory."""
     try:
-        token = job_manager.create_job("discover", request.dict())
+        token = await job_manager.create_job("discover", request.model_dump())
         
         # Start background task
         background_tasks.add_task(
@@ -56,11 +67,43 @@ async def discover_files(request: DiscoverRequest, background_tasks: BackgroundT
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post("/discover:batch", response_model=DiscoverBatchResponse)
+async def discover_files_batch(request: DiscoverBatchRequest, background_tasks: BackgroundTasks):
+    """Discover files for several datasources in one call."""
+    results = []
+    for item in request.requests:
+        # A failure is reported per item so it doesn't abort the whole batch
+        try:
+            token = await job_manager.create_job("discover", item.model_dump())
+        except Exception as e:
+            results.append(DiscoverBatchItem(error=str(e)))
+            continue
+        
+        background_tasks.add_task(
+            _process_discover,
+            token,
+            item.datasource_id,
+            item.uri,
+            item.recurse,
+            item.max_files
+        )
+        results.append(DiscoverBatchItem(token=token))
+    
+    return DiscoverBatchResponse(results=results)
+
+
+@router.post("/bootstrap", response_model=BootstrapResponse)
+async def bootstrap(request: DiscoverRequest, background_tasks: BackgroundTasks):
+    """Health check and discover in one call, for clients that always do both."""
+    discover = await discover_files(request, background_tasks)
+    return BootstrapResponse(status=_HEALTH.status, versions=_HEALTH.versions, token=discover.token)
+
+
 @router.post("/infer_schema", response_model=InferSchemaResponse)
 async def infer_schema(request: InferSchemaRequest, background_tasks: BackgroundTasks):
     """Infer schema from files."""
     try:
-        token = job_manager.create_job("infer_schema", request.dict())
+        token = await job_manager.create_job("infer_schema", request.model_dump())
         
         # Start background task
         background_tasks.add_task(
@@ -81,7 +124,7 @@ async def infer_schema(request: InferSchemaRequest, background_tasks: Background
 async def preview_data(request: PreviewRequest, background_tasks: BackgroundTasks):
     """Preview data from files."""
     try:
-        token = job_manager.create_job("preview", request.dict())
+        token = await job_manager.create_job("preview", request.model_dump())
         
         # Start background task
         background_tasks.add_task(
@@ -89,7 +132,8 @@ async def preview_data(request: PreviewRequest, background_tasks: BackgroundTask
             token,
             request.datasource_id,
             request.path,
-            request.limit
+            request.limit,
+            request.columns
         )
         
         return PreviewResponse(token=token)
@@ -101,14 +145,14 @@ async def preview_data(request: PreviewRequest, background_tasks: BackgroundTask
 async def query_data(request: QueryRequest, background_tasks: BackgroundTasks):
     """Execute query on files."""
     try:
-        token = job_manager.create_job("query", request.dict())
+        token = await job_manager.create_job("query", request.model_dump())
         
         # Start background task
         background_tasks.add_task(
             _process_query,
             token,
             request.datasource_id,
-            request.plan.dict(),
+            request.plan.model_dump(),
             request.output
         )
         
@@ -121,7 +165,7 @@ async def query_data(request: QueryRequest, background_tasks: BackgroundTasks):
 async def analyze_data(request: AnalyzeRequest, background_tasks: BackgroundTasks):
     """Analyze data for EDA, profiling, validation."""
     try:
-        token = job_manager.create_job("analyze", request.dict())
+        token = await job_manager.create_job("analyze", request.model_dump())
         
         # Start background task
         background_tasks.add_task(
@@ -129,7 +173,7 @@ async def analyze_data(request: AnalyzeRequest, background_tasks: BackgroundTask
             token,
             request.frame_ref,
             request.datasource_id,
-            request.plan.dict() if request.plan else None,
+            request.plan.model_dump() if request.plan else None,
             request.job_kind,
             request.options
         )
@@ -139,131 +183,161 @@ async def analyze_data(request: AnalyzeRequest, background_tasks: BackgroundTask
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.get("/jobs/{token}", response_model=JobStatusResponse)
+# Job polling is the hot path: job data comes from our own Redis writes, so
+# it is rendered straight to orjson in an ORJSONResponse. Returning the dict
+# would still send it through FastAPI's pure-Python jsonable_encoder, which
+# dominates poll time once a job holds a large result.
+
+@router.get("/jobs/{token}", response_model=None,
+            responses={200: {"model": JobStatusResponse}})
 async def get_job_status(token: int):
     """Get job status and progress."""
-    job_data = job_manager.get_job(token)
+    job_data = await job_manager.get_job(token)
     if not job_data:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    return JobStatusResponse(
-        token=job_data["token"],
-        status=JobStatus(job_data["status"]),
-        steps=job_data["steps"],
-        data=job_data["data"],
-        code=200 if job_data["status"] != "failed" else 500,
-        error=job_data["error"]
-    )
+    return ORJSONResponse(_job_response(job_data))
+
+
+@router.get("/jobs/{token}/events")
+async def stream_job_events(token: int):
+    """Stream job progress as server-sent events until the job finishes."""
+    if not await job_manager.get_job_status(token):
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def events():
+        async for job_data in job_manager.watch_job(token):
+            yield b"data: " + orjson.dumps(_job_response(job_data)) + b"\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
 
 
-@router.get("/jobs", response_model=List[JobStatusResponse])
+@router.get("/jobs", response_model=None,
+            responses={200: {"model": List[JobStatusResponse]}})
 async def list_jobs():
     """List all jobs."""
-    jobs = job_manager.list_jobs()
-    return [
-        JobStatusResponse(
-            token=job["token"],
-            status=JobStatus(job["status"]),
-            steps=job["steps"],
-            data=job["data"],
-            code=200 if job["status"] != "failed" else 500,
-            error=job["error"]
-        )
-        for job in jobs
-    ]
+    jobs = await job_manager.list_jobs()
+    return ORJSONResponse([_job_response(job) for job in jobs])
 
 
 @router.delete("/jobs/{token}")
 async def cancel_job(token: int):
     """Cancel a running job."""
-    success = job_manager.cancel_job(token)
+    success = await job_manager.cancel_job(token)
     if not success:
         raise HTTPException(status_code=400, detail="Job cannot be cancelled")
     return {"message": "Job cancelled successfully"}
 
 
+def _job_response(job_data: dict) -> dict:
+    """Shape stored job data as a JobStatusResponse body."""
+    return {
+        "token": job_data["token"],
+        "status": job_data["status"],
+        "steps": job_data["steps"],
+        "data": job_data["data"],
+        "code": 200 if job_data["status"] != "failed" else 500,
+        "error": job_data["error"]
+    }
+
+
 # Background task functions
 
+async def _run_blocking(func: Callable[..., Any], *args: Any) -> Any:
+    """Run a blocking data processing call on the worker pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, func, *args)
+
+
 async def _process_discover(token: int, datasource_id: str, uri: str, 
                           recurse: bool, max_files: Optional[int]):
     """Process file discovery in background."""
     try:
-        job_manager.update_job_status(token, "running", "Starting file discovery")
+        await job_manager.update_job_status(token, "running", "Starting file discovery")
         
-        files = data_processor.discover_files(datasource_id, uri, recurse, max_files)
+        files = await _run_blocking(
+            data_processor.discover_files, datasource_id, uri, recurse, max_files
+        )
         
-        job_manager.update_job_status(
+        await job_manager.update_job_status(
             token, "completed", 
             f"Found {len(files)} files",
             data={"files": files}
         )
     except Exception as e:
-        job_manager.update_job_status(token, "failed", error=str(e))
+        await job_manager.update_job_status(token, "failed", error=str(e))
 
 
 async def _process_infer_schema(token: int, datasource_id: str, uri: str,
                               sample_files: Optional[int], infer_rows: int):
     """Process schema inference in background."""
     try:
-        job_manager.update_job_status(token, "running", "Starting schema inference")
+        await job_manager.update_job_status(token, "running", "Starting schema inference")
         
-        schema_data = data_processor.infer_schema(datasource_id, uri, sample_files, infer_rows)
+        schema_data = await _run_blocking(
+            data_processor.infer_schema, datasource_id, uri, sample_files, infer_rows
+        )
         
-        job_manager.update_job_status(
+        await job_manager.update_job_status(
             token, "completed",
             "Schema inference completed",
             data=schema_data
         )
     except Exception as e:
-        job_manager.update_job_status(token, "failed", error=str(e))
+        await job_manager.update_job_status(token, "failed", error=str(e))
 
 
-async def _process_preview(token: int, datasource_id: str, path: Optional[str], limit: int):
+async def _process_preview(token: int, datasource_id: str, path: Optional[str], limit: int,
+                          columns: Optional[List[str]]):
     """Process data preview in background."""
     try:
-        job_manager.update_job_status(token, "running", "Loading data preview")
+        await job_manager.update_job_status(token, "running", "Loading data preview")
         
-        preview_data = data_processor.preview_data(datasource_id, path, limit)
+        preview_data = await _run_blocking(
+            data_processor.preview_data, datasource_id, path, limit, columns
+        )
         
-        job_manager.update_job_status(
+        await job_manager.update_job_status(
             token, "completed",
             f"Preview loaded: {len(preview_data['rows'])} rows",
             data=preview_data
         )
     except Exception as e:
-        job_manager.update_job_status(token, "failed", error=str(e))
+        await job_manager.update_job_status(token, "failed", error=str(e))
 
 
 async def _process_query(token: int, datasource_id: str, plan: dict, output_format: str):
     """Process query execution in background."""
     try:
-        job_manager.update_job_status(token, "running", "Executing query")
+        await job_manager.update_job_status(token, "running", "Executing query")
         
-        query_result = data_processor.execute_query(datasource_id, plan, output_format)
+        query_result = await _run_blocking(
+            data_processor.execute_query, datasource_id, plan, output_format
+        )
         
-        job_manager.update_job_status(
+        await job_manager.update_job_status(
             token, "completed",
             f"Query completed: {query_result['metrics']['rows']} rows",
             data=query_result
         )
     except Exception as e:
-        job_manager.update_job_status(token, "failed", error=str(e))
+        await job_manager.update_job_status(token, "failed", error=str(e))
 
 
 async def _process_analyze(token: int, frame_ref: Optional[dict], datasource_id: Optional[str],
                           plan: Optional[dict], job_kind: str, options: Optional[dict]):
     """Process data analysis in background."""
     try:
-        job_manager.update_job_status(token, "running", f"Starting {job_kind} analysis")
+        await job_manager.update_job_status(token, "running", f"Starting {job_kind} analysis")
         
-        analysis_result = data_processor.analyze_data(
-            frame_ref, datasource_id, plan, job_kind, options
+        analysis_result = await _run_blocking(
+            data_processor.analyze_data, frame_ref, datasource_id, plan, job_kind, options
         )
         
-        job_manager.update_job_status(
+        await job_manager.update_job_status(
             token, "completed",
             f"{job_kind.title()} analysis completed",
             data=analysis_result
         )
     except Exception as e:
-        job_manager.update_job_status(token, "failed", error=str(e))
+        await job_manager.update_job_status(token, "failed", error=str(e))
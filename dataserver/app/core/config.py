@@ -1,7 +1,8 @@
 """Configuration management for AIR-Py FastAPI service."""
 
 from pydantic_settings import BaseSettings
-from typing import List, Optional
+from functools import cached_property
+from typing import FrozenSet, List, Optional
 import os
 
 
@@ -11,6 +12,12 @@ class Settings(BaseSettings):
     # Server configuration
     host: str = "0.0.0.0"
     port: int = 9001
+    # Unix socket path; when set, uvicorn listens here instead of host:port
+    uds: Optional[str] = None
+    # Gzip responses over 1 KB; only worth it when clients are remote
+    gzip_responses: bool = False
+    # uvicorn processes; each gets its own max_workers thread pool
+    server_workers: int = 1
     debug: bool = False
     
     # Authentication (HMAC with Go backend)
@@ -25,6 +32,7 @@ class Settings(BaseSettings):
     max_rows_return_json: int = 50000
     infer_rows: int = 20000
     max_memory_mb: int = 2048
+    # Concurrent Polars jobs per server process
     max_workers: int = 2
     
     # File processing
@@ -34,6 +42,11 @@ class Settings(BaseSettings):
     def allowed_extensions_list(self) -> List[str]:
         """Convert comma-separated string to list."""
         return [ext.strip() for ext in self.allowed_extensions.split(",")]
+    
+    @cached_property
+    def allowed_extensions_set(self) -> FrozenSet[str]:
+        """Lowercased extensions, computed once for per-file membership checks."""
+        return frozenset(ext.lower() for ext in self.allowed_extensions_list)
     temp_dir: str = "/tmp/air-py"
     
     # Go backend communication
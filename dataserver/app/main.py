@@ -2,10 +2,26 @@
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
-import redis
 from app.core.config import settings
-from app.api.endpoints import router
+from app.api.endpoints import router, executor
+from app.services.job_manager import job_manager
+
+
+class EventStreamAwareGZipMiddleware(GZipMiddleware):
+    """GZip responses, except server-sent event streams.
+    
+    Starlette's gzip stream is only flushed when the response ends, which
+    would hold back every event until the job finishes.
+    """
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].endswith("/events"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
 
 
 @asynccontextmanager
@@ -16,8 +32,7 @@ async def lifespan(app: FastAPI):
     
     # Test Redis connection
     try:
-        redis_client = redis.from_url(settings.redis_url)
-        redis_client.ping()
+        await job_manager.redis_client.ping()
         print("Redis connection successful")
     except Exception as e:
         print(f"Redis connection failed: {e}")
@@ -28,6 +43,8 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     print("Shutting down AIR-Py FastAPI server")
+    executor.shutdown(wait=False, cancel_futures=True)
+    await job_manager.redis_client.connection_pool.disconnect()
 
 
 # Create FastAPI app
@@ -35,6 +52,7 @@ app = FastAPI(
     title="AIR-Py Data Processing Service",
     description="FastAPI microservice for data processing and analytics",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -47,6 +65,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in compression for clients across a real network. Off by default: the
+# Go backend talks to us over loopback, where compressing large job results
+# on the event loop costs more than the bytes it saves. Level 1 keeps that
+# stall small when it is enabled.
+if settings.gzip_responses:
+    app.add_middleware(EventStreamAwareGZipMiddleware, minimum_size=1000, compresslevel=1)
+
 # Include API routes
 app.include_router(router, prefix="/v1/py")
 
@@ -67,5 +92,9 @@ if __name__ == "__main__":
         "app.main:app",
         host=settings.host,
         port=settings.port,
-        reload=settings.debug
+        uds=settings.uds,
+        reload=settings.debug,
+        workers=settings.server_workers,
+        loop="uvloop",
+        http="httptools"
     )
@@ -51,6 +51,27 @@ class DiscoverResponse(BaseModel):
     token: int
 
 
+class DiscoverBatchRequest(BaseModel):
+    """Discover files for several datasources in one request."""
+    requests: List[DiscoverRequest]
+
+
+class DiscoverBatchItem(BaseModel):
+    """Outcome of one discover request in a batch."""
+    token: Optional[int] = None
+    error: Optional[str] = None
+
+
+class DiscoverBatchResponse(BaseModel):
+    """Discover files batch response, one result per request in order."""
+    results: List[DiscoverBatchItem]
+
+
+class BootstrapResponse(HealthResponse):
+    """Health check response plus the token of the discover job it started."""
+    token: int
+
+
 class InferSchemaRequest(BaseModel):
     """Infer schema request."""
     datasource_id: str
@@ -69,6 +90,7 @@ class PreviewRequest(BaseModel):
     datasource_id: str
     path: Optional[str] = None
     limit: int = 100
+    columns: Optional[List[str]] = None
 
 
 class PreviewResponse(BaseModel):
@@ -5,12 +5,39 @@ import pandas as pd
 import pyarrow as pa
 import pyarrow.parquet as pq
 from pathlib import Path
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, Iterator, List, Optional, Tuple, Union
 import json
+import operator
 import os
+from functools import reduce
 from app.core.config import settings
 
 
+# Query plan filter operators: op -> (column expr, value) -> predicate expr
+_OPS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "in": lambda col, val: col.is_in(val),
+    "between": lambda col, val: col.is_between(val[0], val[1]),
+}
+
+# Query plan aggregation functions: fn -> column expr -> aggregated expr
+_AGGS = {
+    "sum": pl.Expr.sum,
+    "count": pl.Expr.count,
+    "mean": pl.Expr.mean,
+    "min": pl.Expr.min,
+    "max": pl.Expr.max,
+}
+
+# Internal column name for the row count computed alongside null counts
+_ROW_COUNT_COL = "__air_row_count__"
+
+
 class DataProcessor:
     """Handles data processing operations."""
     
@@ -31,12 +58,10 @@ class DataProcessor:
             if self._is_supported_file(path):
                 files.append(self._get_file_info(path))
         else:
-            pattern = "**/*" if recurse else "*"
-            for file_path in path.glob(pattern):
-                if file_path.is_file() and self._is_supported_file(file_path):
-                    files.append(self._get_file_info(file_path))
-                    if max_files and len(files) >= max_files:
-                        break
+            for entry in self._scan_supported_files(uri, recurse):
+                files.append(self._get_entry_info(entry))
+                if max_files and len(files) >= max_files:
+                    break
         
         return files
     
@@ -48,25 +73,45 @@ class DataProcessor:
         if not files:
             raise ValueError("No supported files found")
         
-        # Sample first file for schema inference
+        # Sample first file for schema inference. Scanning resolves the schema
+        # without reading rows (Parquet reads only the footer).
         sample_file = files[0]["path"]
-        df = self._load_file(sample_file, n_rows=infer_rows)
+        lf = self._scan_file(sample_file, infer_schema_length=infer_rows)
+        field_types = lf.schema
+        
+        # Parquet footers usually carry per-column null counts for the whole
+        # file; otherwise null counts and the sample height come from a
+        # single pass over the sampled rows
+        footer = None
+        if Path(sample_file).suffix.lower() == ".parquet":
+            footer = self._parquet_null_counts(sample_file)
+        if footer and footer[1].keys() == field_types.keys():
+            height, null_counts = footer
+        else:
+            counts = lf.head(infer_rows).select(
+                pl.all().null_count(), pl.count().alias(_ROW_COUNT_COL)
+            ).collect()
+            height = counts[_ROW_COUNT_COL].item()
+            null_counts = self._first_row(counts.drop(_ROW_COUNT_COL))
         
         schema = {
             "fields": [
                 {
                     "name": col,
-                    "type": str(df[col].dtype),
-                    "nullable": df[col].null_count() > 0
+                    "type": str(dtype),
+                    "nullable": null_counts[col] > 0
                 }
-                for col in df.columns
+                for col, dtype in field_types.items()
             ]
         }
         
         stats = {
-            "rows": df.height,
-            "columns": df.width,
-            "null_ratio": {col: df[col].null_count() / df.height if df.height > 0 else 0 for col in df.columns}
+            "rows": height,
+            "columns": len(field_types),
+            "null_ratio": {
+                col: count / height if height > 0 else 0
+                for col, count in null_counts.items()
+            }
         }
         
         return {
@@ -75,7 +120,7 @@ class DataProcessor:
         }
     
     def preview_data(self, datasource_id: str, path: Optional[str] = None, 
-                    limit: int = 100) -> Dict[str, Any]:
+                    limit: int = 100, columns: Optional[List[str]] = None) -> Dict[str, Any]:
         """Preview data from files."""
         if not path:
             files = self.discover_files(datasource_id, ".", max_files=1)
@@ -83,14 +128,14 @@ class DataProcessor:
                 raise ValueError("No files found")
             path = files[0]["path"]
         
-        df = self._load_file(path, n_rows=limit)
+        df = self._load_file(path, n_rows=limit, columns=columns).head(limit)
         
         return {
-            "rows": df.to_dicts()[:limit],
+            "rows": df.to_dicts(),
             "schema": {
                 "fields": [
-                    {"name": col, "type": str(df[col].dtype)}
-                    for col in df.columns
+                    {"name": col, "type": str(dtype)}
+                    for col, dtype in df.schema.items()
                 ]
             },
             "stats": {"sampled": True, "total_rows": df.height}
@@ -99,53 +144,7 @@ class DataProcessor:
     def execute_query(self, datasource_id: str, plan: Dict[str, Any], 
                      output_format: str = "arrow") -> Dict[str, Any]:
         """Execute query plan on files."""
-        # This is a simplified implementation
-        # In production, you'd implement full query execution logic
-        
-        files = self.discover_files(datasource_id, plan["dataset"])
-        if not files:
-            raise ValueError("No files found for dataset")
-        
-        # Load and process first file as example
-        df = self._load_file(files[0]["path"])
-        
-        # Apply filters if specified
-        if plan.get("filters"):
-            for filter_cond in plan["filters"]:
-                col = filter_cond["col"]
-                op = filter_cond["op"]
-                val = filter_cond["val"]
-                
-                if op == ">=":
-                    df = df.filter(pl.col(col) >= val)
-                elif op == "<=":
-                    df = df.filter(pl.col(col) <= val)
-                elif op == "==":
-                    df = df.filter(pl.col(col) == val)
-                # Add more filter operations as needed
-        
-        # Apply select if specified
-        if plan.get("select"):
-            df = df.select(plan["select"])
-        
-        # Apply groupby and aggregations if specified
-        if plan.get("groupby") and plan.get("aggs"):
-            group_cols = plan["groupby"]
-            agg_exprs = []
-            for agg in plan["aggs"]:
-                col = agg["col"]
-                fn = agg["fn"]
-                if fn == "sum":
-                    agg_exprs.append(pl.col(col).sum().alias(f"sum_{col}"))
-                elif fn == "count":
-                    agg_exprs.append(pl.col(col).count().alias(f"count_{col}"))
-                # Add more aggregation functions as needed
-            
-            df = df.group_by(group_cols).agg(agg_exprs)
-        
-        # Apply limit
-        if plan.get("limit"):
-            df = df.limit(plan["limit"])
+        df = self._execute_plan(datasource_id, plan)
         
         if output_format == "arrow":
             # Convert to Arrow format
@@ -165,8 +164,8 @@ class DataProcessor:
                 "rows": df.to_dicts(),
                 "schema": {
                     "fields": [
-                        {"name": col, "type": str(df[col].dtype)}
-                        for col in df.columns
+                        {"name": col, "type": str(dtype)}
+                        for col, dtype in df.schema.items()
                     ]
                 },
                 "metrics": {
@@ -175,6 +174,49 @@ class DataProcessor:
                 }
             }
     
+    def _execute_plan(self, datasource_id: str, plan: Dict[str, Any]) -> pl.DataFrame:
+        """Execute query plan on files and return the collected frame."""
+        files = self.discover_files(datasource_id, plan["dataset"])
+        if not files:
+            raise ValueError("No files found for dataset")
+        
+        # Build one lazy plan over every file so Polars can push filters and
+        # projections down into the scans and fuse group_by/sort/limit
+        lf = self._scan_files([f["path"] for f in files])
+        
+        # Apply filters if specified, fused into a single predicate
+        if plan.get("filters"):
+            predicates = [
+                self._build_filter(f["col"], f["op"], f["val"])
+                for f in plan["filters"]
+            ]
+            lf = lf.filter(reduce(operator.and_, predicates))
+        
+        # Apply select if specified
+        if plan.get("select"):
+            lf = lf.select(plan["select"])
+        
+        # Apply groupby and aggregations if specified
+        if plan.get("groupby") and plan.get("aggs"):
+            agg_exprs = [
+                self._build_agg(agg["col"], agg["fn"])
+                for agg in plan["aggs"]
+            ]
+            lf = lf.group_by(plan["groupby"]).agg(agg_exprs)
+        
+        # Apply ordering; followed by the limit Polars runs it as a top-k
+        if plan.get("order"):
+            lf = lf.sort(
+                [o["col"] for o in plan["order"]],
+                descending=[o.get("dir", "asc").lower() == "desc" for o in plan["order"]]
+            )
+        
+        # Apply limit
+        if plan.get("limit"):
+            lf = lf.limit(plan["limit"])
+        
+        return lf.collect(streaming=True)
+    
     def analyze_data(self, frame_ref: Optional[Dict[str, Any]] = None,
                     datasource_id: Optional[str] = None, plan: Optional[Dict[str, Any]] = None,
                     job_kind: str = "eda", options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
@@ -184,9 +226,8 @@ class DataProcessor:
             # Load from frame reference
             df = self._load_from_frame_ref(frame_ref)
         elif datasource_id and plan:
-            # Execute query plan
-            result = self.execute_query(datasource_id, plan, "json")
-            df = pl.DataFrame(result["rows"])
+            # Execute query plan, keeping the result as a Polars frame
+            df = self._execute_plan(datasource_id, plan)
         else:
             raise ValueError("Either frame_ref or datasource_id+plan must be provided")
         
@@ -201,8 +242,8 @@ class DataProcessor:
             "sample": df.head(50).to_dicts(),
             "schema": {
                 "fields": [
-                    {"name": col, "type": str(df[col].dtype)}
-                    for col in df.columns
+                    {"name": col, "type": str(dtype)}
+                    for col, dtype in df.schema.items()
                 ]
             }
         }
@@ -216,8 +257,7 @@ class DataProcessor:
         
         if job_kind in ["validate", "profile"]:
             # Add data quality checks
-            for col in df.columns:
-                null_count = df[col].null_count()
+            for col, null_count in self._null_counts(df).items():
                 if null_count > 0:
                     analysis["issues"].append({
                         "code": "MISSING_VALUES",
@@ -226,9 +266,67 @@ class DataProcessor:
         
         return analysis
     
+    def _null_counts(self, df: pl.DataFrame) -> Dict[str, int]:
+        """Null count per column, computed in one vectorized pass."""
+        return self._first_row(df.null_count())
+    
+    @staticmethod
+    def _first_row(df: pl.DataFrame) -> Dict[str, Any]:
+        """First row of a one-row frame as a column -> value dict."""
+        if not df.width:
+            return {}
+        return dict(zip(df.columns, df.row(0)))
+    
+    def _parquet_null_counts(self, file_path: str) -> Optional[Tuple[int, Dict[str, int]]]:
+        """Row count and per-column null counts from a Parquet footer.
+        
+        Returns None if any column chunk lacks a null count statistic. Keys
+        are leaf column paths, so nested columns won't match top-level names.
+        """
+        metadata = pq.read_metadata(file_path)
+        null_counts: Dict[str, int] = {}
+        for i in range(metadata.num_row_groups):
+            row_group = metadata.row_group(i)
+            for j in range(row_group.num_columns):
+                column = row_group.column(j)
+                stats = column.statistics
+                if stats is None or not stats.has_null_count:
+                    return None
+                path = column.path_in_schema
+                null_counts[path] = null_counts.get(path, 0) + stats.null_count
+        return metadata.num_rows, null_counts
+    
+    def _build_filter(self, col: str, op: str, val: Any) -> pl.Expr:
+        """Build a filter predicate for one query plan condition."""
+        if op not in _OPS:
+            raise ValueError(f"Unsupported filter operator: {op}")
+        return _OPS[op](pl.col(col), val)
+    
+    def _build_agg(self, col: str, fn: str) -> pl.Expr:
+        """Build an aggregation expression for one query plan aggregate."""
+        if fn not in _AGGS:
+            raise ValueError(f"Unsupported aggregation function: {fn}")
+        return _AGGS[fn](pl.col(col)).alias(f"{fn}_{col}")
+    
     def _is_supported_file(self, file_path: Path) -> bool:
         """Check if file has supported extension."""
-        return file_path.suffix.lower() in settings.allowed_extensions_list
+        return file_path.suffix.lower() in settings.allowed_extensions_set
+    
+    def _scan_supported_files(self, root: str, recurse: bool) -> Iterator[os.DirEntry]:
+        """Yield supported files under root.
+        
+        Uses os.scandir so file/dir checks come from the cached directory
+        entry type instead of a stat() per path. Symlinked directories are
+        not followed.
+        """
+        with os.scandir(root) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if recurse:
+                        yield from self._scan_supported_files(entry.path, recurse)
+                elif (entry.is_file()
+                      and os.path.splitext(entry.name)[1].lower() in settings.allowed_extensions_set):
+                    yield entry
     
     def _get_file_info(self, file_path: Path) -> Dict[str, Any]:
         """Get file information."""
@@ -241,19 +339,57 @@ class DataProcessor:
             "extension": file_path.suffix
         }
     
-    def _load_file(self, file_path: str, n_rows: Optional[int] = None) -> pl.DataFrame:
-        """Load file into Polars DataFrame."""
+    def _get_entry_info(self, entry: os.DirEntry) -> Dict[str, Any]:
+        """Get file information from a scandir entry."""
+        stat = entry.stat()
+        file_path = Path(entry.path)
+        return {
+            "path": str(file_path),
+            "name": entry.name,
+            "size": stat.st_size,
+            "modified": stat.st_mtime,
+            "extension": file_path.suffix
+        }
+    
+    def _load_file(self, file_path: str, n_rows: Optional[int] = None,
+                   columns: Optional[List[str]] = None) -> pl.DataFrame:
+        """Load file into Polars DataFrame, decoding only the given columns."""
         path = Path(file_path)
         
         if path.suffix.lower() == ".csv":
-            return pl.read_csv(file_path, n_rows=n_rows)
+            return pl.read_csv(file_path, n_rows=n_rows, columns=columns)
         elif path.suffix.lower() == ".parquet":
-            return pl.read_parquet(file_path, n_rows=n_rows)
+            return pl.read_parquet(file_path, n_rows=n_rows, columns=columns, memory_map=True)
         elif path.suffix.lower() == ".jsonl":
-            return pl.read_ndjson(file_path, n_rows=n_rows)
+            lf = pl.scan_ndjson(file_path, n_rows=n_rows)
+            return (lf.select(columns) if columns else lf).collect()
         else:
             raise ValueError(f"Unsupported file format: {path.suffix}")
     
+    def _scan_file(self, file_path: str, infer_schema_length: int = 100) -> pl.LazyFrame:
+        """Lazily scan a file without reading it."""
+        path = Path(file_path)
+        
+        if path.suffix.lower() == ".csv":
+            return pl.scan_csv(file_path, infer_schema_length=infer_schema_length)
+        elif path.suffix.lower() == ".parquet":
+            return pl.scan_parquet(file_path)
+        elif path.suffix.lower() == ".jsonl":
+            return pl.scan_ndjson(file_path, infer_schema_length=infer_schema_length)
+        else:
+            raise ValueError(f"Unsupported file format: {path.suffix}")
+    
+    def _scan_files(self, file_paths: List[str]) -> pl.LazyFrame:
+        """Lazily scan several files as one frame, relaxing dtypes across files.
+        
+        Columns are matched by name, so files may order them differently;
+        a column missing from a file is filled with nulls for its rows.
+        """
+        scans = [self._scan_file(file_path) for file_path in file_paths]
+        if len(scans) == 1:
+            return scans[0]
+        return pl.concat(scans, how="diagonal_relaxed")
+    
     def _load_from_frame_ref(self, frame_ref: Dict[str, Any]) -> pl.DataFrame:
         """Load DataFrame from frame reference."""
         # This would implement loading from Arrow, Parquet, or JSON references
@@ -1,95 +1,202 @@
 """Job management service for async processing."""
 
-import redis
-import json
-from typing import Dict, Any, Optional, List
+from redis import asyncio as aioredis
+import asyncio
+import orjson
+import time
+from typing import AsyncIterator, Dict, Any, Optional, List
 from datetime import datetime, timezone
 from app.core.config import settings
 
 
+JOB_TTL_SECONDS = 3600  # 1 hour
+
+# Sorted set of job tokens scored by creation time, newest last
+JOBS_INDEX_KEY = "jobs_index"
+
+# Persistent counter that hands out job tokens across all workers
+JOBS_COUNTER_KEY = "jobs:counter"
+
+# Statuses after which a job never changes again
+TERMINAL_JOB_STATUSES = {"completed", "failed", "cancelled"}
+
+# Applies one status update to the job hash and its steps list in a single
+# round-trip. Updates for jobs that no longer exist (expired or never
+# created) are dropped instead of recreating a partial job.
+#   KEYS[1] = job:{token}    KEYS[2] = job:{token}:steps
+#   ARGV[1] = status         ARGV[2] = step JSON ('' = no step)
+#   ARGV[3] = data JSON      ARGV[4] = error ('' = no error)
+#   ARGV[5] = TTL seconds
+UPDATE_JOB_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'status', ARGV[1])
+if ARGV[2] ~= '' then
+    redis.call('RPUSH', KEYS[2], ARGV[2])
+end
+if ARGV[3] ~= '' then
+    redis.call('HSET', KEYS[1], 'data', ARGV[3])
+end
+if ARGV[4] ~= '' then
+    redis.call('HSET', KEYS[1], 'error', ARGV[4], 'status', 'failed')
+end
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+redis.call('EXPIRE', KEYS[2], ARGV[5])
+return 1
+"""
+
+
 class JobManager:
-    """Manages async job state and progress."""
+    """Manages async job state and progress.
+    
+    Each job is stored as a hash at ``job:{token}`` holding its scalar fields
+    (params and data as JSON), with progress steps appended to a sibling list
+    at ``job:{token}:steps``. Tokens are indexed by creation time in the
+    ``jobs_index`` sorted set so listing never scans the keyspace.
+    """
     
     def __init__(self):
-        self.redis_client = redis.from_url(settings.redis_url)
-        self.job_counter = 0
+        # Bounded pool: under load, callers wait briefly for a free
+        # connection instead of opening new sockets without limit
+        pool = aioredis.BlockingConnectionPool.from_url(
+            settings.redis_url,
+            max_connections=2 * settings.max_workers + 8,
+            timeout=2
+        )
+        self.redis_client = aioredis.Redis(connection_pool=pool)
+        # SCRIPT LOAD happens lazily on first call, so import doesn't need Redis
+        self._update_script = self.redis_client.register_script(UPDATE_JOB_SCRIPT)
     
-    def create_job(self, job_type: str, params: Dict[str, Any]) -> int:
+    async def create_job(self, job_type: str, params: Dict[str, Any]) -> int:
         """Create a new job and return token."""
-        self.job_counter += 1
-        token = self.job_counter
-        
-        job_data = {
-            "token": token,
-            "type": job_type,
-            "status": "pending",
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "params": params,
-            "steps": [],
-            "data": None,
-            "error": None
-        }
+        token = int(await self.redis_client.incr(JOBS_COUNTER_KEY))
         
-        self.redis_client.setex(
-            f"job:{token}",
-            3600,  # 1 hour TTL
-            json.dumps(job_data)
-        )
+        job_key = f"job:{token}"
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.hset(job_key, mapping={
+                "token": token,
+                "type": job_type,
+                "status": "pending",
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "params": orjson.dumps(params)
+            })
+            pipe.expire(job_key, JOB_TTL_SECONDS)
+            pipe.zadd(JOBS_INDEX_KEY, {token: time.time()})
+            await pipe.execute()
         
         return token
     
-    def update_job_status(self, token: int, status: str, step: Optional[str] = None, 
+    async def update_job_status(self, token: int, status: str, step: Optional[str] = None,
                          data: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
         """Update job status and add step."""
-        job_key = f"job:{token}"
-        job_data = self.get_job(token)
-        
-        if not job_data:
-            return
-        
-        job_data["status"] = status
-        
+        step_json = ""
         if step:
-            step_data = {
-                "step": len(job_data["steps"]) + 1,
+            step_json = orjson.dumps({
                 "message": step,
-                "timestamp": datetime.now(timezone.utc).isoformat()
-            }
-            job_data["steps"].append(step_data)
-        
-        if data:
-            job_data["data"] = data
+                "timestamp": datetime.now(timezone.utc)
+            })
         
-        if error:
-            job_data["error"] = error
-            job_data["status"] = "failed"
-        
-        self.redis_client.setex(job_key, 3600, json.dumps(job_data))
+        await self._update_script(
+            keys=[f"job:{token}", f"job:{token}:steps"],
+            args=[
+                status,
+                step_json,
+                orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS) if data else "",
+                error or "",
+                JOB_TTL_SECONDS
+            ]
+        )
     
-    def get_job(self, token: int) -> Optional[Dict[str, Any]]:
+    async def get_job(self, token: int) -> Optional[Dict[str, Any]]:
         """Get job data by token."""
-        job_data = self.redis_client.get(f"job:{token}")
-        if job_data:
-            return json.loads(job_data)
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.hgetall(f"job:{token}")
+            pipe.lrange(f"job:{token}:steps", 0, -1)
+            fields, steps = await pipe.execute()
+        if fields:
+            return self._decode_job(fields, steps)
         return None
     
-    def list_jobs(self) -> List[Dict[str, Any]]:
-        """List all jobs."""
-        keys = self.redis_client.keys("job:*")
+    async def get_job_status(self, token: int) -> Optional[str]:
+        """Get only the status of a job, without loading its steps or data."""
+        status = await self.redis_client.hget(f"job:{token}", "status")
+        return status.decode() if status else None
+    
+    async def list_jobs(self) -> List[Dict[str, Any]]:
+        """List all jobs, newest first."""
+        tokens = await self.redis_client.zrevrange(JOBS_INDEX_KEY, 0, -1)
+        # Plain pipeline: one round-trip for every job without holding Redis
+        # in a MULTI/EXEC block for the whole batch
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for token in tokens:
+                pipe.hgetall(b"job:" + token)
+                pipe.lrange(b"job:" + token + b":steps", 0, -1)
+            results = await pipe.execute()
+        
         jobs = []
-        for key in keys:
-            job_data = self.redis_client.get(key)
-            if job_data:
-                jobs.append(json.loads(job_data))
-        return sorted(jobs, key=lambda x: x["created_at"], reverse=True)
+        expired = []
+        for token, fields, steps in zip(tokens, results[::2], results[1::2]):
+            if fields:
+                jobs.append(self._decode_job(fields, steps))
+            else:
+                expired.append(token)
+        
+        # Job hashes expire via TTL; drop their tokens from the index lazily
+        if expired:
+            await self.redis_client.zrem(JOBS_INDEX_KEY, *expired)
+        return jobs
+    
+    async def watch_job(self, token: int, poll_interval: float = 0.05,
+                        max_interval: float = 0.5) -> AsyncIterator[Dict[str, Any]]:
+        """Yield the job whenever its status or steps change, until it finishes.
+        
+        Redis is polled here with backoff so that clients get one event per
+        change instead of polling over HTTP. Stops if the job expires.
+        """
+        last_seen = None
+        delay = poll_interval
+        while True:
+            job_data = await self.get_job(token)
+            if not job_data:
+                return
+            
+            seen = (job_data["status"], len(job_data["steps"]))
+            if seen != last_seen:
+                last_seen = seen
+                delay = poll_interval
+                yield job_data
+                if job_data["status"] in TERMINAL_JOB_STATUSES:
+                    return
+            else:
+                delay = min(delay * 2, max_interval)
+            
+            await asyncio.sleep(delay)
     
-    def cancel_job(self, token: int) -> bool:
+    async def cancel_job(self, token: int) -> bool:
         """Cancel a running job."""
-        job_data = self.get_job(token)
-        if job_data and job_data["status"] in ["pending", "running"]:
-            self.update_job_status(token, "cancelled", "Job cancelled by user")
+        if await self.get_job_status(token) in ["pending", "running"]:
+            await self.update_job_status(token, "cancelled", "Job cancelled by user")
             return True
         return False
+    
+    @staticmethod
+    def _decode_job(fields: Dict[bytes, bytes], steps: List[bytes]) -> Dict[str, Any]:
+        """Assemble the job dict from its Redis hash fields and steps list."""
+        job = {key.decode(): value for key, value in fields.items()}
+        return {
+            "token": int(job["token"]),
+            "type": job["type"].decode(),
+            "status": job["status"].decode(),
+            "created_at": job["created_at"].decode(),
+            "params": orjson.loads(job["params"]),
+            "steps": [
+                {"step": number, **orjson.loads(raw)}
+                for number, raw in enumerate(steps, start=1)
+            ],
+            "data": orjson.loads(job["data"]) if "data" in job else None,
+            "error": job["error"].decode() if "error" in job else None
+        }
 
 
 # Global job manager instance
@@ -0,0 +1,36 @@
+"""Shared pytest fixtures for the AIR-Py server checks in test_server.py."""
+
+import asyncio
+
+import httpx
+import pytest
+import pytest_asyncio
+
+import test_server
+
+
+@pytest.fixture(scope="session")
+def event_loop():
+    """One event loop for the session so the shared client can be reused."""
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest_asyncio.fixture(scope="session")
+async def client():
+    """One keep-alive client shared by every test; skips if no server is up."""
+    async with test_server.make_client() as c:
+        try:
+            await c.get(test_server.HEALTH_URL)
+        except httpx.ConnectError:
+            pytest.skip(f"AIR-Py server not running at {test_server.BASE_URL}")
+        yield c
+
+
+@pytest_asyncio.fixture(scope="session")
+async def discover_token(client):
+    """Run discover once per session and share the job token."""
+    tokens = await test_server.discover(client, [test_server.DISCOVER_PAYLOAD])
+    assert tokens and tokens[0] is not None
+    return tokens[0]
@@ -0,0 +1,36 @@
+"""Checks for DataProcessor query planning over multi-file datasets."""
+
+import polars as pl
+
+from app.services.data_processor import data_processor
+
+
+def _write_mixed_dataset(root):
+    """CSV and Parquet files with differing column order and a missing column."""
+    pl.DataFrame({"site": ["a", "b"], "kwh": [1, 2]}).write_csv(root / "1.csv")
+    pl.DataFrame({"kwh": [3.5], "site": ["c"]}).write_parquet(root / "2.parquet")
+    pl.DataFrame({"kwh": [4]}).write_csv(root / "3.csv")
+
+def test_query_aligns_columns_by_name(tmp_path):
+    """Files are combined by column name, not position."""
+    _write_mixed_dataset(tmp_path)
+    plan = {"dataset": str(tmp_path), "order": [{"col": "kwh"}]}
+    result = data_processor.execute_query("test", plan, output_format="json")
+    assert result["rows"] == [
+        {"site": "a", "kwh": 1.0},
+        {"site": "b", "kwh": 2.0},
+        {"site": "c", "kwh": 3.5},
+        {"site": None, "kwh": 4.0},
+    ]
+
+def test_query_filters_across_mixed_files(tmp_path):
+    """Filters and projections apply to every file in the dataset."""
+    _write_mixed_dataset(tmp_path)
+    plan = {
+        "dataset": str(tmp_path),
+        "filters": [{"col": "kwh", "op": ">", "val": 2}],
+        "select": ["site"],
+        "order": [{"col": "site"}],
+    }
+    result = data_processor.execute_query("test", plan, output_format="json")
+    assert [row["site"] for row in result["rows"]] == [None, "c"]
@@ -1,93 +1,285 @@
 #!/usr/bin/env python3
-"""Simple test script for AIR-Py FastAPI server."""
+"""Simple test script for AIR-Py FastAPI server.
 
-import requests
-import json
+Runs a one-shot smoke test by default. With --iterations N it becomes a load
+harness that fires N concurrent bootstrap/wait rounds and reports
+latency percentiles.
+"""
+
+import argparse
+import asyncio
+import httpx
+import logging
+import numpy as np
+import orjson
 import time
 
-def test_health():
-    """Test health endpoint."""
+log = logging.getLogger("air.test")
+
+# IPv4 loopback literal: no getaddrinfo per connection, no IPv6-first fallback
+BASE_URL = "http://127.0.0.1:9001"
+HEALTH_URL = "/v1/py/health"
+DISCOVER_BATCH_URL = "/v1/py/discover:batch"
+BOOTSTRAP_URL = "/v1/py/bootstrap"
+JOBS_URL_TMPL = "/v1/py/jobs/{}".format
+JOB_EVENTS_URL_TMPL = "/v1/py/jobs/{}/events".format
+
+DISCOVER_PAYLOAD = {
+    "datasource_id": "test",
+    "uri": ".",
+    "recurse": False,
+    "max_files": 5
+}
+
+# The load loop posts the same batch every round, so encode it once
+DISCOVER_BODY = orjson.dumps({"requests": [DISCOVER_PAYLOAD]})
+BOOTSTRAP_BODY = orjson.dumps(DISCOVER_PAYLOAD)
+JSON_HEADERS = {"content-type": "application/json"}
+
+# Attempts per probe request, and the first backoff delay in seconds
+RETRY_ATTEMPTS = 3
+RETRY_BACKOFF = 0.1
+# Methods safe to resend after the server may have seen the request
+IDEMPOTENT_METHODS = {"GET", "HEAD"}
+
+def make_client(max_connections=4, uds=None):
+    """Create a keep-alive client so every request reuses pooled connections.
+    
+    With `uds`, requests go over that Unix socket instead of TCP; the host in
+    the base URL then only fills the Host header.
+    """
+    return httpx.AsyncClient(
+        base_url="http://localhost" if uds else BASE_URL,
+        # Fail fast when nothing is listening; the transport retries connects
+        timeout=httpx.Timeout(5.0, connect=1.0),
+        transport=httpx.AsyncHTTPTransport(retries=2, uds=uds),
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=30
+        )
+    )
+
+TERMINAL_STATUSES = {"completed", "failed", "cancelled"}
+
+async def _request(client, method, url, **kwargs):
+    """Send a request, retrying transient failures with exponential backoff.
+    
+    GETs are retried on any transport error or 5xx. Other methods create
+    jobs, and a 5xx or a dropped response may come after the server already
+    started one, so they are only retried when the connection never opened.
+    """
+    idempotent = method in IDEMPOTENT_METHODS
+    retryable = httpx.TransportError if idempotent else (httpx.ConnectError, httpx.ConnectTimeout)
+    for attempt in range(RETRY_ATTEMPTS):
+        last = attempt == RETRY_ATTEMPTS - 1
+        try:
+            response = await client.request(method, url, **kwargs)
+        except retryable:
+            if last:
+                raise
+        else:
+            if response.status_code < 500 or not idempotent or last:
+                return response
+        await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+async def check_health(client):
+    """Check health endpoint."""
     try:
-        response = requests.get("http://localhost:9001/v1/py/health")
+        response = await _request(client, "GET", HEALTH_URL)
         if response.status_code == 200:
-            data = response.json()
-            print("✅ Health check passed")
-            print(f"   Status: {data['status']}")
-            print(f"   Versions: {data['versions']}")
+            data = orjson.loads(response.content)
+            log.info("✅ Health check passed\n   Status: %s\n   Versions: %s",
+                     data["status"], data["versions"])
             return True
         else:
-            print(f"❌ Health check failed: {response.status_code}")
+            log.error("❌ Health check failed: %s", response.status_code)
             return False
     except Exception as e:
-        print(f"❌ Health check error: {e}")
+        log.error("❌ Health check error: %s", e)
         return False
 
-def test_discover():
-    """Test discover endpoint."""
+async def discover(client, payloads):
+    """Submit discover jobs in one batch, returning one token (or None) per payload."""
     try:
-        payload = {
-            "datasource_id": "test",
-            "uri": ".",
-            "recurse": False,
-            "max_files": 5
-        }
-        response = requests.post("http://localhost:9001/v1/py/discover", json=payload)
+        body = (DISCOVER_BODY if payloads == [DISCOVER_PAYLOAD]
+                else orjson.dumps({"requests": payloads}))
+        response = await _request(client, "POST", DISCOVER_BATCH_URL, content=body, headers=JSON_HEADERS)
         if response.status_code == 200:
-            data = response.json()
-            print("✅ Discover test passed")
-            print(f"   Token: {data['token']}")
-            return data['token']
+            data = orjson.loads(response.content)
+            tokens = [item["token"] for item in data["results"]]
+            log.info("✅ Discover test passed\n   Tokens: %s", tokens)
+            for item in data["results"]:
+                if item["error"]:
+                    log.error("   ❌ %s", item["error"])
+            return tokens
         else:
-            print(f"❌ Discover test failed: {response.status_code}")
+            log.error("❌ Discover test failed: %s", response.status_code)
+            return []
+    except Exception as e:
+        log.error("❌ Discover test error: %s", e)
+        return []
+
+async def bootstrap(client):
+    """Health check and discover in one POST, returning the job token or None."""
+    try:
+        response = await _request(client, "POST", BOOTSTRAP_URL, content=BOOTSTRAP_BODY, headers=JSON_HEADERS)
+        if response.status_code == 200:
+            data = orjson.loads(response.content)
+            log.info("✅ Bootstrap test passed\n   Status: %s\n   Versions: %s\n   Token: %s",
+                     data["status"], data["versions"], data["token"])
+            return data["token"]
+        else:
+            log.error("❌ Bootstrap test failed: %s", response.status_code)
             return None
     except Exception as e:
-        print(f"❌ Discover test error: {e}")
+        log.error("❌ Bootstrap test error: %s", e)
         return None
 
-def test_job_status(token):
-    """Test job status endpoint."""
+async def check_job_status(client, token):
+    """Check job status endpoint."""
     try:
-        response = requests.get(f"http://localhost:9001/v1/py/jobs/{token}")
+        response = await _request(client, "GET", JOBS_URL_TMPL(token))
         if response.status_code == 200:
-            data = response.json()
-            print("✅ Job status test passed")
-            print(f"   Status: {data['status']}")
-            print(f"   Steps: {len(data['steps'])}")
+            # Parse the body bytes directly; response.json() would first
+            # decode a str copy of a steps list that can grow large
+            data = orjson.loads(response.content)
+            log.info("✅ Job status test passed\n   Status: %s\n   Steps: %d",
+                     data["status"], len(data["steps"]))
             return True
         else:
-            print(f"❌ Job status test failed: {response.status_code}")
+            log.error("❌ Job status test failed: %s", response.status_code)
             return False
     except Exception as e:
-        print(f"❌ Job status test error: {e}")
+        log.error("❌ Job status test error: %s", e)
         return False
 
-def main():
-    """Run all tests."""
-    print("Testing AIR-Py FastAPI server...")
-    print("=" * 50)
+async def _follow_events(client, token, deadline):
+    """Read a job's event stream; True once an event carries a terminal status."""
+    timeout = httpx.Timeout(5.0, read=deadline)
+    async with client.stream("GET", JOB_EVENTS_URL_TMPL(token), timeout=timeout) as response:
+        if response.status_code != 200:
+            return False
+        async for line in response.aiter_lines():
+            if line.startswith("data: "):
+                if orjson.loads(line[6:])["status"] in TERMINAL_STATUSES:
+                    return True
+    return False
+
+async def wait_done(client, token, deadline=10.0):
+    """Wait for a job to reach a terminal status via its server-sent events."""
+    try:
+        return await asyncio.wait_for(_follow_events(client, token, deadline), deadline)
+    except (asyncio.TimeoutError, httpx.ReadTimeout):
+        return False
+
+# pytest entry points; the shared client and discover_token fixtures are in
+# conftest.py, so discover runs once per session
+
+async def test_health(client):
+    """Health endpoint responds."""
+    assert await check_health(client)
+
+async def test_bootstrap(client):
+    """Bootstrap reports health and starts a discover job."""
+    assert await bootstrap(client) is not None
+
+async def test_job_status(client, discover_token):
+    """Discover job finishes and its status can be read."""
+    assert await wait_done(client, discover_token)
+    assert await check_job_status(client, discover_token)
+
+async def _round_trip(client):
+    """Run one bootstrap + wait-for-job round; True if the job finished."""
+    response = await _request(client, "POST", BOOTSTRAP_URL, content=BOOTSTRAP_BODY, headers=JSON_HEADERS)
+    if response.status_code != 200:
+        return False
+    return await wait_done(client, orjson.loads(response.content)["token"])
+
+async def run_load(client, concurrency, iterations):
+    """Fire rounds with at most `concurrency` in flight and log a summary."""
+    sem = asyncio.Semaphore(concurrency)
+    # Successful round latencies in ns, pre-sized so samples are never boxed
+    latencies = np.empty(iterations, dtype=np.int64)
+    ok_count = 0
+    failures = 0
+    
+    async def one():
+        nonlocal ok_count, failures
+        async with sem:
+            start = time.perf_counter_ns()
+            try:
+                ok = await _round_trip(client)
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies[ok_count] = time.perf_counter_ns() - start
+                ok_count += 1
+            else:
+                failures += 1
     
-    # Test health
-    if not test_health():
-        print("Server not running. Start with: make dev-data")
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(iterations)))
+    elapsed = time.perf_counter() - started
+    
+    summary = "%d rounds @ concurrency %d: %d ok, %d failed in %.2fs (%.1f rounds/s)"
+    args = [iterations, concurrency, ok_count, failures, elapsed, iterations / elapsed]
+    if ok_count:
+        summary += "; p50 %.1f ms, p95 %.1f ms, p99 %.1f ms"
+        args += list(np.percentile(latencies[:ok_count], [50, 95, 99]) / 1e6)
+    log.info(summary, *args)
+
+async def main(args):
+    """Run all tests."""
+    if args.iterations:
+        async with make_client(args.concurrency, uds=args.uds) as client:
+            await run_load(client, args.concurrency, args.iterations)
         return
     
-    print()
+    log.info("Testing AIR-Py FastAPI server...")
+    log.info("=" * 50)
     
-    # Test discover
-    token = test_discover()
-    if token:
-        print()
+    # One client shared by every probe in the smoke test
+    async with make_client(uds=args.uds) as client:
+        # Health and discover share one round-trip
+        token = await bootstrap(client)
+        if token is None:
+            log.error("Server not running. Start with: make dev-data")
+            return
+        
+        log.info("")
         
-        # Wait a moment for processing
-        print("Waiting for job to complete...")
-        time.sleep(2)
+        # Wait for processing to finish
+        log.info("Waiting for job %s to complete...", token)
+        if not await wait_done(client, token):
+            log.error("❌ Job did not finish in time")
         
         # Test job status
-        test_job_status(token)
+        await check_job_status(client, token)
     
-    print()
-    print("=" * 50)
-    print("Test completed!")
+    log.info("")
+    log.info("=" * 50)
+    log.info("Test completed!")
+
+def parse_args():
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=0,
+                        help="run N load-test rounds instead of the smoke test")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="maximum rounds in flight during a load test")
+    parser.add_argument("--uds", metavar="PATH",
+                        help="connect over this Unix socket (server run with UDS=PATH)")
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    main()
+    # One stream handler on the root; only our logger is raised to INFO so
+    # httpx's per-request records stay hidden
+    logging.basicConfig(format="%(message)s")
+    log.setLevel(logging.INFO)
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    asyncio.run(main(parse_args()))